@@ -7,42 +7,23 @@ CLI 入口：支持五个场景
 - rag: 本地轻量级 RAG (Files-to-Prompt)
 """
 
-import click
-import json
-import hashlib
-from pathlib import Path
-from scenarios import scenario_1_local_snapshot
-from scenarios import scenario_2_repo_adapt
-from scenarios import scenario_3_regression
-from scenarios import scenario_4_arch_drift
-from scenarios import scenario_5_local_rag
-from scenarios import scenario_6_code_review
-
-
-@click.group()
-def cli():
-    """代码仓库分析工具
-
-    支持六个核心场景：
-    1. snapshot - 本地快照与回滚
-    2. adapt - 开源项目理解与组织化改造
-    3. regression - 回归检测与质量门禁
-    4. arch-drift - 架构影响与漂移扫描
-    5. rag - 本地轻量级 RAG (Files-to-Prompt)
-    6. code-review - 代码审查 (安全、质量、性能)
-    """
-    pass
+import argparse
+import os
+import sys
+import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import json_io, snapshot_store
 
 
-@cli.command()
-@click.option('--patterns', multiple=True, default=['**/*.py'], help='文件匹配模式')
-@click.option('--model', default='gpt-4', help='LLM 模型')
 def snapshot(patterns, model):
     """场景①：创建本地快照
 
     扫描项目文件，解析代码结构，使用 AI 分析并生成快照
     """
-    click.echo("场景①：本地快照与回滚")
+    from scenarios import scenario_1_local_snapshot
+
+    print("场景①：本地快照与回滚")
     config = {
         'file_patterns': list(patterns),
         'model': model
@@ -50,148 +31,221 @@ def snapshot(patterns, model):
     result = scenario_1_local_snapshot.run(config)
     snapshot_id = result.get('snapshot_id')
     if snapshot_id:
-        click.echo(f"Snapshot created: {snapshot_id}")
+        print(f"Snapshot created: {snapshot_id}")
         # 打印部分内容
         response = result.get('llm_response', '')
         if response:
             preview = response[:300] + "..." if len(response) > 300 else response
-            click.echo(f"\n快照预览：\n{preview}\n")
+            print(f"\n快照预览：\n{preview}\n")
     else:
-        click.echo("快照已生成（mock LLM 内容），详见 .ai-snapshots/ 目录")
+        print("快照已生成（mock LLM 内容），详见 .ai-snapshots/ 目录")
 
 
-@cli.command(name='snapshot-list')
 def snapshot_list():
     """列出所有快照"""
-    snapshots_dir = Path(".ai-snapshots")
+    snapshots_dir = snapshot_store.SNAPSHOTS_DIR
     if not snapshots_dir.exists():
-        click.echo("No snapshots found")
+        print("No snapshots found")
+        return
+
+    # 目录 mtime 未变（没有新增/删除快照）时直接输出上次的结果
+    cache_file = snapshots_dir / ".list-cache.json"
+    rendered = _load_list_cache(cache_file, snapshots_dir)
+    if rendered is not None:
+        sys.stdout.write(rendered)
         return
 
-    snapshot_files = sorted(snapshots_dir.glob("snapshot-*.json"), reverse=True)
+    snapshots = snapshot_store.list_snapshots(snapshots_dir)
 
-    if not snapshot_files:
-        click.echo("No snapshots found")
+    if not snapshots:
+        print("No snapshots found")
         return
 
-    click.echo("Available Snapshots:\n")
-    for snap_file in snapshot_files:
+    # 先拼好整张列表再一次性输出，避免逐行 write
+    lines = ["Available Snapshots:\n"]
+    for snapshot_id, snap_file in snapshots:
         try:
-            with open(snap_file, 'r') as f:
-                data = json.load(f)
-            timestamp = data.get('timestamp', 'unknown')
-            file_count = len(data.get('files', {}))
-            snapshot_id = snap_file.stem.replace('snapshot-', '')
-            click.echo(f"  [{snapshot_id}] {timestamp} - {file_count} files")
+            timestamp, file_count = snapshot_store.read_snapshot_meta(snap_file)
+            lines.append(f"  [{snapshot_id}] {timestamp} - {file_count} files")
         except Exception as e:
-            click.echo(f"  [Error] {snap_file.name}: {e}")
+            lines.append(f"  [Error] {os.path.basename(snap_file)}: {e}")
+    rendered = "\n".join(lines) + "\n"
+    sys.stdout.write(rendered)
+    _save_list_cache(cache_file, snapshots_dir, rendered)
+
+
+def _load_list_cache(cache_file, snapshots_dir):
+    """返回缓存的 snapshot-list 输出；目录有变化或缓存不可信时返回 None"""
+    try:
+        cache = json_io.load(cache_file)
+        mtime = os.stat(snapshots_dir).st_mtime_ns
+    except (OSError, ValueError):
+        return None
+    if cache.get('mtime') != mtime:
+        return None
+    # 与 git 的 racy 判断相同：缓存写入时目录刚被修改过，mtime 精度不足以区分，不信任
+    if cache.get('written_ns', 0) - mtime < snapshot_store.RACY_WINDOW_NS:
+        return None
+    return cache.get('rendered')
+
+
+def _save_list_cache(cache_file, snapshots_dir, rendered):
+    """保存 snapshot-list 输出及对应的目录 mtime"""
+    try:
+        # 创建缓存文件本身会改变目录 mtime，先确保文件存在再取 mtime；
+        # 之后原地覆盖内容不会再改变目录
+        cache_file.touch(exist_ok=True)
+        mtime = os.stat(snapshots_dir).st_mtime_ns
+        json_io.dump({
+            'mtime': mtime,
+            'written_ns': time.time_ns(),
+            'rendered': rendered
+        }, cache_file)
+    except OSError:
+        pass
 
 
-@cli.command(name='snapshot-restore')
-@click.argument('snapshot_id')
 def snapshot_restore(snapshot_id):
     """从快照恢复文件
 
     示例: python cli.py snapshot-restore 20250101_120000
     """
-    snapshot_file = Path(f".ai-snapshots/snapshot-{snapshot_id}.json")
+    snapshot_file = snapshot_store.SNAPSHOTS_DIR / f"snapshot-{snapshot_id}.json"
 
     if not snapshot_file.exists():
-        click.echo(f"Snapshot not found: {snapshot_id}")
-        click.echo("Run 'python cli.py snapshot-list' to see available snapshots")
+        print(f"Snapshot not found: {snapshot_id}")
+        print("Run 'python cli.py snapshot-list' to see available snapshots")
         return
 
     try:
-        with open(snapshot_file, 'r') as f:
-            snapshot_data = json.load(f)
-
-        files = snapshot_data.get('files', {})
         restored_count = 0
         hash_matches = 0
+        unchanged_count = 0
+        stat_index = snapshot_store.load_stat_index()
 
-        click.echo(f"Restoring from snapshot {snapshot_id}...\n")
-
-        for file_path, file_data in files.items():
-            content = file_data.get('content', '')
-            expected_hash = file_data.get('hash', '')
-
-            # 写入文件
-            full_path = Path(file_path)
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        print(f"Restoring from snapshot {snapshot_id}...\n")
 
-            # 验证哈希
-            actual_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-            if actual_hash == expected_hash:
+        def count(status):
+            nonlocal restored_count, hash_matches, unchanged_count
+            if status != snapshot_store.MISMATCH:
                 hash_matches += 1
-
+            if status == snapshot_store.UNCHANGED:
+                unchanged_count += 1
             restored_count += 1
 
-        click.echo(f"Restored {restored_count} files")
-        click.echo(f"Hash verification: {hash_matches}/{restored_count} files matched")
+        # 写盘与哈希都会释放 GIL，用线程池让 I/O 与校验重叠
+        created_dirs = set()
+        manifest_paths = set()
+        first_paths = {}  # (hash_algo, hash) -> 第一个出现该内容的路径
+        duplicates = []
+        with ThreadPoolExecutor(max_workers=snapshot_store.MAX_WORKERS) as executor:
+            futures = {}
+            # 边解析边提交，第一个文件无需等待整个快照加载完
+            for file_path, file_data in snapshot_store.iter_snapshot_files(snapshot_file):
+                manifest_paths.add(file_path)
+                # 目录只创建一次，避免每个文件重复 mkdir
+                parent = os.path.dirname(file_path)
+                if parent and parent not in created_dirs:
+                    os.makedirs(parent, exist_ok=True)
+                    # 祖先目录也已存在，后续遇到时直接跳过
+                    while parent and parent not in created_dirs:
+                        created_dirs.add(parent)
+                        parent = os.path.dirname(parent)
+
+                # 对象库中相同内容只解压、校验一次，其余等第一份写好后再拷贝。
+                # 旧版内嵌 content 的条目不去重：没有解压可省，且可能缺少 hash
+                # 或 hash 与内容不符，按 hash 归并会写错内容
+                content_key = None
+                if 'content' not in file_data and file_data.get('hash'):
+                    content_key = (file_data.get('hash_algo', 'sha256'), file_data['hash'])
+                    if content_key in first_paths:
+                        duplicates.append((content_key, file_path, file_data))
+                        continue
+                    first_paths[content_key] = file_path
+                futures[executor.submit(
+                    snapshot_store.restore_file, file_path, file_data,
+                    snapshot_store.OBJECTS_DIR, stat_index
+                )] = content_key
+
+            first_status = {}
+            for future in as_completed(futures):
+                status = future.result()
+                if futures[future] is not None:
+                    first_status[futures[future]] = status
+                count(status)
+
+            copy_futures = [
+                executor.submit(
+                    snapshot_store.copy_restored, first_paths[content_key], file_path,
+                    file_data, first_status[content_key], stat_index
+                )
+                for content_key, file_path, file_data in duplicates
+            ]
+            for future in as_completed(copy_futures):
+                count(future.result())
+
+        snapshot_store.save_stat_index(snapshot_store.prune_stat_index(stat_index, manifest_paths))
 
         if hash_matches == restored_count:
-            click.echo("All files restored successfully with matching hashes")
+            verdict = "All files restored successfully with matching hashes"
         else:
-            click.echo("Some files have hash mismatches")
+            verdict = "Some files have hash mismatches"
+        sys.stdout.write(
+            f"Restored {restored_count} files ({unchanged_count} already up to date)\n"
+            f"Hash verification: {hash_matches}/{restored_count} files matched\n"
+            f"{verdict}\n"
+        )
 
     except Exception as e:
-        click.echo(f"Error restoring snapshot: {e}")
+        print(f"Error restoring snapshot: {e}")
 
 
-@cli.command()
-@click.argument('repo', required=False)
-@click.option('--model', default='gpt-4', help='LLM 模型')
 def adapt(repo, model):
     """场景②：开源项目理解与组织化改造
 
     分析开源仓库，按组织规范生成改造计划
 
-    示例：\n
-    python cli.py adapt https://github.com/pallets/flask
+    示例：
+      python cli.py adapt https://github.com/pallets/flask
     """
+    from scenarios import scenario_2_repo_adapt
+
     if not repo:
-        click.echo("需要提供仓库 URL")
-        click.echo("示例: python cli.py adapt https://github.com/pallets/flask")
+        print("需要提供仓库 URL")
+        print("示例: python cli.py adapt https://github.com/pallets/flask")
         return
 
-    click.echo(f"场景②：开源项目理解与组织化改造")
-    click.echo(f"仓库：{repo}")
+    print(f"场景②：开源项目理解与组织化改造")
+    print(f"仓库：{repo}")
 
     config = {'repo_url': repo, 'model': model}
     result = scenario_2_repo_adapt.run(config)
 
     if result.get('error'):
-        click.echo(f"错误：{result['error']}")
+        print(f"错误：{result['error']}")
         return
 
     out = result.get('output_file_path')
     if out:
-        click.echo(f"改造计划已保存：{out}")
+        print(f"改造计划已保存：{out}")
         # 打印关键信息
         if 'llm_response' in result:
             response = result['llm_response']
             if 'plan:' in response:
                 plan_start = response.find('plan:')
                 plan_section = response[plan_start:plan_start+500]
-                click.echo(f"\n计划摘要：\n{plan_section}...\n")
+                print(f"\n计划摘要：\n{plan_section}...\n")
 
 
-@cli.command()
-@click.option('--baseline', default='main~1', help='基线版本（默认: main~1）')
-@click.option('--build', default='HEAD', help='构建版本（默认: HEAD）')
-@click.option('--model', default='gpt-4', help='LLM 模型')
-@click.option('--pass-rate-min', default=95, help='最低测试通过率')
-@click.option('--coverage-drop-max', default=5, help='最大覆盖率降幅')
 def regression(baseline, build, model, pass_rate_min, coverage_drop_max):
     """场景③：回归检测与质量门禁
 
     收集测试、覆盖率、Lint 指标，AI 评估是否放行
     """
-    click.echo("场景③：回归检测与质量门禁")
-    click.echo(f"基线：{baseline}, 构建：{build}")
+    from scenarios import scenario_3_regression
+
+    print("场景③：回归检测与质量门禁")
+    print(f"基线：{baseline}, 构建：{build}")
 
     config = {
         'baseline': baseline,
@@ -204,45 +258,38 @@ def regression(baseline, build, model, pass_rate_min, coverage_drop_max):
 
     out = result.get('output_file_path')
     if out:
-        click.echo(f"门禁结果已保存：{out}")
+        print(f"门禁结果已保存：{out}")
         # 打印门禁判定
         if 'llm_response' in result:
             response = result['llm_response']
             if 'gate:' in response or 'PASS' in response or 'FAIL' in response:
                 lines = response.split('\n')[:10]
-                click.echo(f"\n门禁判定：\n" + '\n'.join(lines) + "\n")
+                print(f"\n门禁判定：\n" + '\n'.join(lines) + "\n")
 
 
-@cli.command(name='arch-drift')
-@click.option('--model', default='gpt-4', help='LLM 模型')
 def arch_drift(model):
     """场景④：架构影响与漂移扫描
 
     分析依赖图、分层违规、复杂度、API 破坏，AI 审计架构健康度
     """
-    click.echo("场景④：架构影响与漂移扫描")
+    from scenarios import scenario_4_arch_drift
+
+    print("场景④：架构影响与漂移扫描")
 
     config = {'model': model}
     result = scenario_4_arch_drift.run(config)
 
     out = result.get('output_file_path')
     if out:
-        click.echo(f"架构门禁结果已保存：{out}")
+        print(f"架构门禁结果已保存：{out}")
         # 打印架构评分
         if 'llm_response' in result:
             response = result['llm_response']
             if 'arch_gate:' in response or 'score:' in response:
                 lines = response.split('\n')[:15]
-                click.echo(f"\n架构评估：\n" + '\n'.join(lines) + "\n")
+                print(f"\n架构评估：\n" + '\n'.join(lines) + "\n")
 
 
-@cli.command()
-@click.option('--patterns', multiple=True, default=['**/*.py'], help='文件匹配模式 (可多次指定)')
-@click.option('--query', required=True, help='要问 LLM 的问题')
-@click.option('--format', type=click.Choice(['xml', 'markdown']), default='xml', help='输出格式')
-@click.option('--cxml', is_flag=True, help='使用紧凑 XML 格式（适合长上下文）')
-@click.option('--line-numbers', is_flag=True, help='包含行号')
-@click.option('--model', default='claude-3-haiku-20240307', help='LLM 模型')
 def rag(patterns, query, format, cxml, line_numbers, model):
     """场景⑤：本地轻量级 RAG (Files-to-Prompt)
 
@@ -258,9 +305,11 @@ def rag(patterns, query, format, cxml, line_numbers, model):
       python cli.py rag --patterns "**/*.py" --query "项目架构是什么？"
       python cli.py rag --patterns "tests/**" --query "生成测试文档" --format markdown
     """
-    click.echo("场景⑤：本地轻量级 RAG (Files-to-Prompt)")
-    click.echo(f"文件模式: {', '.join(patterns)}")
-    click.echo(f"问题: {query}\n")
+    from scenarios import scenario_5_local_rag
+
+    print("场景⑤：本地轻量级 RAG (Files-to-Prompt)")
+    print(f"文件模式: {', '.join(patterns)}")
+    print(f"问题: {query}\n")
 
     result = scenario_5_local_rag.run_rag_query(
         project_root=".",
@@ -275,34 +324,27 @@ def rag(patterns, query, format, cxml, line_numbers, model):
     # 显示统计信息
     stats = result.get('files_to_prompt_stats', {})
     if stats:
-        click.echo(f"统计信息:")
-        click.echo(f"   - 处理文件数: {stats.get('files_processed', 0)}")
-        click.echo(f"   - 总行数: {stats.get('total_lines', 0):,}")
-        click.echo(f"   - 总字符数: {stats.get('total_chars', 0):,}")
-        click.echo(f"   - 平均每文件行数: {stats.get('avg_lines_per_file', 0)}\n")
+        print(f"统计信息:")
+        print(f"   - 处理文件数: {stats.get('files_processed', 0)}")
+        print(f"   - 总行数: {stats.get('total_lines', 0):,}")
+        print(f"   - 总字符数: {stats.get('total_chars', 0):,}")
+        print(f"   - 平均每文件行数: {stats.get('avg_lines_per_file', 0)}\n")
 
     # 显示 LLM 响应
     response = result.get('llm_response', '')
     if response:
-        click.echo("LLM 回答:")
-        click.echo("-" * 80)
-        click.echo(response)
-        click.echo("-" * 80)
+        print("LLM 回答:")
+        print("-" * 80)
+        print(response)
+        print("-" * 80)
     else:
         error = result.get('files_to_prompt_error') or result.get('llm_error')
         if error:
-            click.echo(f"错误: {error}")
+            print(f"错误: {error}")
         else:
-            click.echo("未收到响应")
+            print("未收到响应")
 
 
-@cli.command(name='code-review')
-@click.option('--git-diff', is_flag=True, help='Review current git changes')
-@click.option('--git-ref', default=None, help='Git reference to diff against (e.g., HEAD~1, main)')
-@click.option('--diff', 'diff_file', default=None, help='Path to diff/patch file')
-@click.option('--output', default=None, help='Output file path')
-@click.option('--format', 'output_format', type=click.Choice(['yaml', 'json', 'markdown']), default='yaml', help='Output format')
-@click.option('--security-only', is_flag=True, help='Only run security checks')
 def code_review(git_diff, git_ref, diff_file, output, output_format, security_only):
     """Scenario 6: Comprehensive code review
 
@@ -314,8 +356,10 @@ def code_review(git_diff, git_ref, diff_file, output, output_format, security_on
       python cli.py code-review --diff changes.patch --format markdown
       python cli.py code-review --git-diff --security-only
     """
-    click.echo("Scenario 6: Code Review Pipeline")
-    click.echo("=" * 80)
+    from scenarios import scenario_6_code_review
+
+    print("Scenario 6: Code Review Pipeline")
+    print("=" * 80)
 
     # Determine what to review
     if git_diff or (not git_ref and not diff_file):
@@ -329,11 +373,11 @@ def code_review(git_diff, git_ref, diff_file, output, output_format, security_on
         git_ref_to_use = None
         source = f"diff file: {diff_file}"
     else:
-        click.echo("Error: Specify --git-diff, --git-ref, or --diff")
+        print("Error: Specify --git-diff, --git-ref, or --diff")
         return
 
-    click.echo(f"Reviewing: {source}")
-    click.echo()
+    print(f"Reviewing: {source}")
+    print()
 
     # Build config
     config = {
@@ -347,11 +391,11 @@ def code_review(git_diff, git_ref, diff_file, output, output_format, security_on
     if security_only:
         config["quality_checks"] = []
         config["performance_checks"] = []
-        click.echo("Mode: Security checks only")
+        print("Mode: Security checks only")
     else:
-        click.echo("Mode: Full review (security + quality + performance)")
+        print("Mode: Full review (security + quality + performance)")
 
-    click.echo()
+    print()
 
     # Run review
     try:
@@ -362,65 +406,151 @@ def code_review(git_diff, git_ref, diff_file, output, output_format, security_on
         security_gate = result.get("security_gate_status", "N/A")
         security_reason = result.get("security_gate_reason", "")
 
-        click.echo("Results:")
-        click.echo("-" * 80)
-        click.echo(f"Security Gate: {security_gate}")
+        print("Results:")
+        print("-" * 80)
+        print(f"Security Gate: {security_gate}")
         if security_reason:
-            click.echo(f"Reason: {security_reason}")
-        click.echo()
+            print(f"Reason: {security_reason}")
+        print()
 
-        click.echo(f"Total Issues: {overall_summary.get('total_issues', 0)}")
-        click.echo(f"New Issues: {overall_summary.get('new_issues', 0)}")
-        click.echo()
+        print(f"Total Issues: {overall_summary.get('total_issues', 0)}")
+        print(f"New Issues: {overall_summary.get('new_issues', 0)}")
+        print()
 
         # Category breakdown
         by_category = overall_summary.get("by_category", {})
         if any(by_category.values()):
-            click.echo("By Category:")
+            print("By Category:")
             for category, count in by_category.items():
                 if count > 0:
-                    click.echo(f"  - {category.capitalize()}: {count}")
-            click.echo()
+                    print(f"  - {category.capitalize()}: {count}")
+            print()
 
         # Severity breakdown
         by_severity = overall_summary.get("by_severity", {})
         if any(by_severity.values()):
-            click.echo("By Severity:")
+            print("By Severity:")
             for severity in ["critical", "high", "medium", "low"]:
                 count = by_severity.get(severity, 0)
                 if count > 0:
-                    click.echo(f"  - {severity.capitalize()}: {count}")
-            click.echo()
+                    print(f"  - {severity.capitalize()}: {count}")
+            print()
 
         # Top findings
         all_findings = result.get("all_findings", [])
         if all_findings:
-            click.echo("Top Issues:")
+            print("Top Issues:")
             for finding in all_findings[:5]:  # Show top 5
                 severity = finding["severity"].upper()
                 file_path = finding["file"]
                 line = finding["line"]
                 message = finding["message"]
-                click.echo(f"  [{severity}] {file_path}:{line}")
-                click.echo(f"    {message}")
+                print(f"  [{severity}] {file_path}:{line}")
+                print(f"    {message}")
             if len(all_findings) > 5:
-                click.echo(f"  ... and {len(all_findings) - 5} more issues")
-            click.echo()
+                print(f"  ... and {len(all_findings) - 5} more issues")
+            print()
 
         # Output file
         if "output_file_path" in result:
-            click.echo(f"Full report saved to: {result['output_file_path']}")
+            print(f"Full report saved to: {result['output_file_path']}")
         elif not output:
             # Print to stdout if no output file specified
-            click.echo("-" * 80)
-            click.echo(result.get("formatted_report", "No report generated"))
+            print("-" * 80)
+            print(result.get("formatted_report", "No report generated"))
 
     except Exception as e:
-        click.echo(f"Error during code review: {e}")
+        print(f"Error during code review: {e}")
         import traceback
         traceback.print_exc()
 
-    click.echo("=" * 80)
+    print("=" * 80)
+
+
+def _build_parser():
+    """构建命令行解析器，子命令与各场景函数一一对应"""
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description="""代码仓库分析工具
+
+支持六个核心场景：
+1. snapshot - 本地快照与回滚
+2. adapt - 开源项目理解与组织化改造
+3. regression - 回归检测与质量门禁
+4. arch-drift - 架构影响与漂移扫描
+5. rag - 本地轻量级 RAG (Files-to-Prompt)
+6. code-review - 代码审查 (安全、质量、性能)""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    def add_command(name, func):
+        # 子命令说明取自函数 docstring：首行作为简介，其余去掉缩进作为详细说明
+        summary, _, details = (func.__doc__ or '').partition('\n')
+        sub = subparsers.add_parser(
+            name,
+            help=summary,
+            description=f"{summary}\n{textwrap.dedent(details)}",
+            formatter_class=argparse.RawDescriptionHelpFormatter
+        )
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = add_command('snapshot', snapshot)
+    sub.add_argument('--patterns', action='append', help='文件匹配模式')
+    sub.add_argument('--model', default='gpt-4', help='LLM 模型')
+
+    add_command('snapshot-list', snapshot_list)
+
+    sub = add_command('snapshot-restore', snapshot_restore)
+    sub.add_argument('snapshot_id')
+
+    sub = add_command('adapt', adapt)
+    sub.add_argument('repo', nargs='?')
+    sub.add_argument('--model', default='gpt-4', help='LLM 模型')
+
+    sub = add_command('regression', regression)
+    sub.add_argument('--baseline', default='main~1', help='基线版本（默认: main~1）')
+    sub.add_argument('--build', default='HEAD', help='构建版本（默认: HEAD）')
+    sub.add_argument('--model', default='gpt-4', help='LLM 模型')
+    sub.add_argument('--pass-rate-min', type=int, default=95, help='最低测试通过率')
+    sub.add_argument('--coverage-drop-max', type=int, default=5, help='最大覆盖率降幅')
+
+    sub = add_command('arch-drift', arch_drift)
+    sub.add_argument('--model', default='gpt-4', help='LLM 模型')
+
+    sub = add_command('rag', rag)
+    sub.add_argument('--patterns', action='append', help='文件匹配模式 (可多次指定)')
+    sub.add_argument('--query', required=True, help='要问 LLM 的问题')
+    sub.add_argument('--format', choices=['xml', 'markdown'], default='xml', help='输出格式')
+    sub.add_argument('--cxml', action='store_true', help='使用紧凑 XML 格式（适合长上下文）')
+    sub.add_argument('--line-numbers', action='store_true', help='包含行号')
+    sub.add_argument('--model', default='claude-3-haiku-20240307', help='LLM 模型')
+
+    sub = add_command('code-review', code_review)
+    sub.add_argument('--git-diff', action='store_true', help='Review current git changes')
+    sub.add_argument('--git-ref', default=None, help='Git reference to diff against (e.g., HEAD~1, main)')
+    sub.add_argument('--diff', dest='diff_file', default=None, help='Path to diff/patch file')
+    sub.add_argument('--output', default=None, help='Output file path')
+    sub.add_argument('--format', dest='output_format', choices=['yaml', 'json', 'markdown'], default='yaml', help='Output format')
+    sub.add_argument('--security-only', action='store_true', help='Only run security checks')
+
+    return parser
+
+
+def cli(argv=None):
+    """命令行入口"""
+    parser = _build_parser()
+    args = vars(parser.parse_args(argv))
+    func = args.pop('func', None)
+    args.pop('command', None)
+    if func is None:
+        parser.print_help()
+        return
+    # append 动作不能带默认列表（会被追加），未指定时在这里补默认值
+    if 'patterns' in args and args['patterns'] is None:
+        args['patterns'] = ['**/*.py']
+    func(**args)
 
 
 if __name__ == '__main__':
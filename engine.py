@@ -5,7 +5,11 @@ Supports: sync nodes, async nodes, batch processing, parallel execution, retry m
 import asyncio
 import warnings
 import copy
+import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, NamedTuple, Optional
 
 
 # ============================================================================
@@ -21,30 +25,113 @@ def node(prep=None, exec=None, post=None):
     }
 
 
+class FlowStep(NamedTuple):
+    """Flow 中的一步；prep/exec/post 在 add() 时从节点字典取出，run 时只做属性访问"""
+    name: str
+    node: dict
+    on: Optional[str]
+    params: dict
+    reads: Optional[frozenset]
+    writes: Optional[frozenset]
+    prep: Callable
+    exec: Callable
+    post: Callable
+
+
 class Flow:
-    """Legacy Flow class (backward compatible)"""
+    """Legacy Flow class (backward compatible)
+
+    add() 可选声明节点读写的 context 键（reads / writes）。声明了的节点之间
+    没有数据冲突时并发执行；未声明的节点视为读写全部键，与前后节点保持串行。
+    所有节点都未声明时按添加顺序依次执行（与原行为相同）。
+
+    Example:
+        f.add(parse_code_node(), name="parse", reads=["files"], writes=["ast_results"])
+        f.add(check_license_node(), name="license", reads=["files"], writes=["licenses"])
+    """
     def __init__(self):
         self.nodes = []
 
-    def add(self, node_func, name, on=None, params=None):
-        self.nodes.append({
-            "name": name,
-            "node": node_func,
-            "on": on,
-            "params": params or {}
-        })
+    def add(self, node_func, name, on=None, params=None, reads=None, writes=None):
+        self.nodes.append(FlowStep(
+            name=name,
+            node=node_func,
+            on=on,
+            params=params or {},
+            reads=None if reads is None else frozenset(reads),
+            writes=None if writes is None else frozenset(writes),
+            prep=node_func["prep"],
+            exec=node_func["exec"],
+            post=node_func["post"]
+        ))
         return self
 
     def run(self, shared_store):
-        for nfo in self.nodes:
-            n = nfo["node"]
-            p = nfo["params"]
-            prep = n["prep"](shared_store, p)
-            out = n["exec"](prep, p)
-            _ = n["post"](shared_store, prep, out, p)
+        if all(step.reads is None and step.writes is None for step in self.nodes):
+            for step in self.nodes:
+                params = step.params
+                prep = step.prep(shared_store, params)
+                out = step.exec(prep, params)
+                step.post(shared_store, prep, out, params)
+            return shared_store
+        return self._run_parallel(shared_store)
+
+    def _run_parallel(self, shared_store):
+        """按 reads/writes 冲突建依赖图，Kahn 算法调度到线程池（节点以 I/O 为主）"""
+        count = len(self.nodes)
+        dependents = [[] for _ in range(count)]
+        remaining = [0] * count
+        for j in range(count):
+            for i in range(j):
+                if _conflicts(self.nodes[i], self.nodes[j]):
+                    dependents[i].append(j)
+                    remaining[j] += 1
+
+        ready = deque(j for j in range(count) if remaining[j] == 0)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as executor:
+            while ready or running:
+                # 出错后不再提交新节点，等已在运行的结束再抛出
+                while ready and error is None:
+                    j = ready.popleft()
+                    running[executor.submit(_run_step, self.nodes[j], shared_store)] = j
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    j = running.pop(fut)
+                    if fut.exception() is not None:
+                        error = error or fut.exception()
+                        continue
+                    for k in dependents[j]:
+                        remaining[k] -= 1
+                        if remaining[k] == 0:
+                            ready.append(k)
+        if error is not None:
+            raise error
         return shared_store
 
 
+def _run_step(step, shared_store):
+    params = step.params
+    prep = step.prep(shared_store, params)
+    out = step.exec(prep, params)
+    return step.post(shared_store, prep, out, params)
+
+
+def _conflicts(a, b):
+    """a 先于 b 添加时，b 是否必须等 a 完成（写后读、写后写、读后写）"""
+    return (_overlaps(a.writes, b.reads)
+            or _overlaps(a.writes, b.writes)
+            or _overlaps(a.reads, b.writes))
+
+
+def _overlaps(keys_a, keys_b):
+    # None 表示未声明，按涉及全部键处理
+    return keys_a is None or keys_b is None or not keys_a.isdisjoint(keys_b)
+
+
 def flow():
     """Legacy flow constructor (backward compatible)"""
     return Flow()
@@ -423,7 +510,7 @@ class AsyncParallelBatchFlow(AsyncFlow, BatchFlow):
 
 __all__ = [
     # Legacy API
-    'node', 'flow', 'Flow',
+    'node', 'flow', 'Flow', 'FlowStep',
 
     # Base classes
     'BaseNode', 'Node', 'FlowNode',
@@ -38,7 +38,7 @@ fi
 info "Step 1: Creating initial snapshot..."
 python3 cli.py snapshot --patterns "**/*.py" --model "claude-3-haiku-20240307" > /tmp/snap1.log 2>&1
 
-SNAPSHOT1=$(ls -t .ai-snapshots/snapshot-*.json 2>/dev/null | head -1)
+SNAPSHOT1=$(ls -t .ai-snapshots/snapshot-*.json 2>/dev/null | grep -v "\.meta\.json$" | head -1)
 if [ -n "$SNAPSHOT1" ]; then
     SNAPSHOT1_ID=$(basename "$SNAPSHOT1" | sed 's/snapshot-//; s/.json//')
     ok "Snapshot created: $SNAPSHOT1_ID"
@@ -66,7 +66,7 @@ ok "Modified cli.py"
 info "Step 3: Creating second snapshot after modification..."
 python3 cli.py snapshot --patterns "**/*.py" --model "claude-3-haiku-20240307" > /tmp/snap2.log 2>&1
 
-SNAPSHOT2=$(ls -t .ai-snapshots/snapshot-*.json 2>/dev/null | head -1)
+SNAPSHOT2=$(ls -t .ai-snapshots/snapshot-*.json 2>/dev/null | grep -v "\.meta\.json$" | head -1)
 if [ -n "$SNAPSHOT2" ] && [ "$SNAPSHOT2" != "$SNAPSHOT1" ]; then
     SNAPSHOT2_ID=$(basename "$SNAPSHOT2" | sed 's/snapshot-//; s/.json//')
     ok "Second snapshot created: $SNAPSHOT2_ID"
@@ -94,7 +94,18 @@ echo ""
 
 # Step 7: 计算回滚后的文件哈希
 info "Step 7: Computing file hash after rollback..."
-HASH_AFTER=$(sha256sum cli.py | awk '{print $1}')
+HASH_AFTER=$(python3 -c "
+import json
+from utils.snapshot_store import new_hasher
+with open('$SNAPSHOT1', 'r') as f:
+    data = json.load(f)
+# Hash with the algorithm recorded for cli.py in snapshot 1
+algo = next((d.get('hash_algo', 'sha256') for p, d in data['files'].items() if p.endswith('cli.py')), 'sha256')
+h = new_hasher(algo)
+with open('cli.py', 'rb') as f:
+    h.update(f.read())
+print(h.hexdigest())
+")
 echo "Hash after rollback: $HASH_AFTER"
 echo ""
 
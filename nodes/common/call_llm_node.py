@@ -1,20 +1,34 @@
 from engine import node
 from utils.llm_client import call_llm
+from utils import async_llm_client
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import asyncio
+import functools
+import string
 
 def call_llm_node():
     """调用 LLM 节点
 
-    支持两种方式提供 Prompt：
+    支持三种方式提供 Prompt：
     1. prompt_template: 直接提供模板字符串
     2. prompt_file: 提供模板文件路径（相对于项目根目录）
+    3. prompt_template_compiled: 预编译的模板对象（如 jinja2.Template），
+       用 render(mapping) 渲染，优先于前两者
+
+    批量模式：params["batch_key"] 指向 context 中的列表时，每个元素生成一个 prompt
+    （字符串直接作为 prompt；字典与 context 合并后渲染模板），并发调用 LLM，
+    结果按顺序写入 ctx["llm_responses"]。并发数由 params["concurrency"] 控制（默认 8）。
+    params["use_async"] 为 True 时批量请求改用 asyncio（utils.async_llm_client），
+    适合几十个以上的 prompt；此时 concurrency 默认 32。
     """
     def prep(ctx, params):
         # 优先从文件加载模板
         template = params.get("prompt_template", "")
         prompt_file = params.get("prompt_file", "")
+        compiled = params.get("prompt_template_compiled")
 
-        if prompt_file:
+        if prompt_file and compiled is None:
             # 从文件加载模板
             file_path = Path(prompt_file)
             if not file_path.is_absolute():
@@ -22,16 +36,21 @@ def call_llm_node():
                 project_root = Path(ctx.get("project_root", "."))
                 file_path = project_root / prompt_file
 
-            if file_path.exists():
-                with open(file_path, "r", encoding="utf-8") as f:
-                    template = f.read()
-            else:
+            try:
+                st = file_path.stat()
+            except FileNotFoundError:
                 raise FileNotFoundError(f"Prompt file not found: {file_path}")
+            template = _read_template(str(file_path), st.st_mtime_ns, st.st_size)
 
-        # 防止 KeyError：允许模板里出现缺失字段
-        class D(dict):
-            def __missing__(self, k): return ""
-        prompt = template.format_map(D(**ctx))
+        render = compiled.render if compiled is not None else _compile_template(template)
+        batch_key = params.get("batch_key")
+        if batch_key and isinstance(ctx.get(batch_key), list):
+            prompt = [
+                item if isinstance(item, str) else render({**ctx, **item})
+                for item in ctx[batch_key]
+            ]
+        else:
+            prompt = render(ctx)
         return {
             "prompt": prompt,
             "model": params.get("model", "gpt-4"),
@@ -40,6 +59,10 @@ def call_llm_node():
         }
 
     def exec(prep_result, params):
+        if isinstance(prep_result["prompt"], list):
+            if params.get("use_async", False):
+                return _exec_batch_async(prep_result, params.get("concurrency", 32))
+            return _exec_batch(prep_result, params.get("concurrency", 8))
         try:
             resp = call_llm(
                 prompt=prep_result["prompt"],
@@ -52,6 +75,9 @@ def call_llm_node():
             return {"success": False, "error": str(e)}
 
     def post(ctx, prep_result, exec_result, params):
+        if exec_result["success"] and "responses" in exec_result:
+            ctx["llm_responses"] = exec_result["responses"]
+            return "llm_complete"
         if exec_result["success"]:
             ctx["llm_response"] = exec_result["response"]
             return "llm_complete"
@@ -59,3 +85,87 @@ def call_llm_node():
         return "llm_failed"
 
     return node(prep=prep, exec=exec, post=post)
+
+
+class _LenientFormatter(string.Formatter):
+    """模板里缺失的字段渲染为空字符串，避免 KeyError"""
+    def get_value(self, key, args, kwargs):
+        return kwargs.get(key, "")
+
+
+_FORMATTER = _LenientFormatter()
+
+
+@functools.lru_cache(maxsize=32)
+def _read_template(file_path, mtime_ns, size):
+    """读取模板文件；以 mtime/大小为键缓存，文件修改后自动重新读取"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_template(template):
+    """解析一次模板，返回 render(mapping)
+
+    渲染结果与 str.format_map 一致（支持 !r 转换、格式说明、a.b / a[0] 字段），
+    同一模板在循环或批量调用中不再重复解析。
+    """
+    segments = []
+    for literal, field, format_spec, conversion in _FORMATTER.parse(template):
+        if field is None:
+            segments.append((literal, None, None, None, None))
+            continue
+        # 格式说明里嵌套字段（如 {x:{width}}）时按模板再渲染
+        spec = _compile_template(format_spec) if "{" in format_spec else format_spec
+        simple = field.isidentifier()
+        segments.append((literal, field, simple, conversion, spec))
+
+    def render(mapping):
+        out = []
+        for literal, field, simple, conversion, spec in segments:
+            out.append(literal)
+            if field is None:
+                continue
+            if simple:
+                value = mapping.get(field, "")
+            else:
+                value = _FORMATTER.get_field(field, (), mapping)[0]
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            out.append(format(value, spec(mapping) if callable(spec) else spec))
+        return "".join(out)
+
+    return render
+
+
+def _exec_batch(prep_result, concurrency):
+    """并发调用 LLM：请求以网络等待为主，线程池即可重叠多个往返"""
+    def one(prompt):
+        return call_llm(
+            prompt=prompt,
+            model=prep_result["model"],
+            temperature=prep_result["temperature"],
+            max_tokens=prep_result["max_tokens"]
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            responses = list(executor.map(one, prep_result["prompt"]))
+        return {"success": True, "responses": responses}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _exec_batch_async(prep_result, concurrency):
+    """在事件循环里并发调用 LLM，在途请求数不超过 concurrency"""
+    try:
+        responses = asyncio.run(async_llm_client.call_llm_batch(
+            prep_result["prompt"],
+            model=prep_result["model"],
+            temperature=prep_result["temperature"],
+            max_tokens=prep_result["max_tokens"],
+            concurrency=concurrency
+        ))
+        return {"success": True, "responses": responses}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -1,9 +1,17 @@
 from engine import node
 from pathlib import Path
 import fnmatch
+import os
+import re
 
 def get_files_node():
-    """获取文件列表节点"""        
+    """获取文件列表节点
+
+    patterns 使用 pathlib 风格的 glob：* 不跨目录，** 匹配任意层目录。
+    与 Path.glob 不同的是，结尾的 **（如 tests/**）匹配其下的所有文件；
+    Path.glob 对它只返回目录，旧实现因此得到空列表。
+    遍历基于 os.scandir，只进入可能匹配 patterns 的目录，以 /** 结尾的排除目录整棵跳过。
+    """
     def prep(ctx, params):
         project_root = Path(ctx.get("project_root", ".")).resolve()
         patterns = params.get("patterns", ["**/*"])
@@ -13,40 +21,40 @@ def get_files_node():
             "project_root": project_root,
             "patterns": patterns,
             "exclude": exclude,
-            "extensions": extensions
+            # 去重后转成 tuple：str.endswith 一次 C 调用检查所有扩展名
+            "extensions": tuple(frozenset(extensions)),
+            # 所有 pattern 合并成一个正则，只编译一次
+            "include_re": _compile_globs(patterns),
+            "walk_roots": _walk_roots(patterns),
+            # 排除规则同时匹配去掉结尾 /** 的形式（与逐条 fnmatch 时一致）
+            "exclude_re": _compile_fnmatch(exclude + [ex.rstrip('/**') for ex in exclude]),
+            "prune_re": _compile_fnmatch([ex[:-3] for ex in exclude if ex.endswith("/**")])
         }
 
     def exec(prep_result, params):
-        root = prep_result["project_root"]
-        patterns = prep_result["patterns"]
-        exclude = prep_result["exclude"]
+        root = str(prep_result["project_root"])
+        include_re = prep_result["include_re"]
+        exclude_re = prep_result["exclude_re"]
         exts = prep_result["extensions"]
 
         all_files = set()
 
-        # Use glob for each pattern
-        for pattern in patterns:
-            for path in root.glob(pattern):
-                if not path.is_file():
+        for rel_root, max_depth in prep_result["walk_roots"]:
+            for abs_path, rel in _scan(root, rel_root, max_depth, prep_result["prune_re"]):
+                # extension：最便宜的检查放在最前面
+                if exts and not rel.endswith(exts):
                     continue
-                rel = path.relative_to(root).as_posix()
 
-                # exclude
-                excluded = False
-                for ex in exclude:
-                    if fnmatch.fnmatch(rel, ex) or fnmatch.fnmatch(rel, ex.rstrip('/**')):
-                        excluded = True
-                        break
-                if excluded:
+                if not include_re.match(rel):
                     continue
 
-                # extension
-                if exts and path.suffix not in exts:
+                # exclude
+                if exclude_re.match(rel):
                     continue
 
-                all_files.add(str(path.resolve()))
+                all_files.add(abs_path)
 
-        return sorted(list(all_files))
+        return sorted(all_files)
 
     def post(ctx, prep_result, exec_result, params):
         ctx["files"] = exec_result
@@ -54,3 +62,170 @@ def get_files_node():
         return "files_retrieved"
 
     return node(prep=prep, exec=exec, post=post)
+
+
+def _scan(root, rel_root, max_depth, prune_re):
+    """从 root/rel_root 开始遍历，产出 (绝对路径, 相对 root 的 posix 路径)
+
+    DirEntry 自带 readdir 给出的类型信息，判断文件/目录不需要额外 stat；
+    相对路径靠字符串拼接维护。与 pathlib 的 ** 一样不进入符号链接目录。
+    """
+    start = os.path.join(root, rel_root) if rel_root else root
+    stack = [(start, rel_root + "/" if rel_root else "", 0)]
+    while stack:
+        dir_path, rel_prefix, depth = stack.pop()
+        try:
+            it = os.scandir(dir_path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = rel_prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is not None and depth + 1 >= max_depth:
+                        continue
+                    if prune_re.match(rel):
+                        continue
+                    stack.append((entry.path, rel + "/", depth + 1))
+                elif entry.is_file():
+                    yield entry.path, rel
+
+
+def _split_glob(pattern):
+    return [part for part in pattern.split("/") if part not in ("", ".")]
+
+
+def _has_magic(part):
+    return any(c in part for c in "*?[")
+
+
+def _walk_roots(patterns):
+    """每个 pattern 的遍历起点和最大深度
+
+    起点是开头不含通配符的目录部分（如 tests/**/*.py 只需遍历 tests/）；
+    不含 ** 的 pattern 深度固定（如 *.py 只看顶层）。返回 [(rel_root, max_depth|None)]。
+    """
+    roots = {}
+    for pattern in patterns:
+        parts = _split_glob(pattern)
+        i = 0
+        while i < len(parts) - 1 and not _has_magic(parts[i]):
+            i += 1
+        root, rest = "/".join(parts[:i]), parts[i:]
+        depth = None if "**" in rest else len(rest)
+        if root in roots:
+            prev = roots[root]
+            depth = None if prev is None or depth is None else max(prev, depth)
+        roots[root] = depth
+
+    # 已被不限深度的上级起点覆盖的起点不必再遍历
+    return [
+        (root, depth) for root, depth in roots.items()
+        if not any(
+            other_depth is None and other != root and (other == "" or root.startswith(other + "/"))
+            for other, other_depth in roots.items()
+        )
+    ]
+
+
+def _compile_fnmatch(patterns):
+    """把多个 fnmatch 模式合并成一个正则；Windows 上与 fnmatch.fnmatch 一样不区分大小写"""
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    unique = dict.fromkeys(patterns)
+    if not unique:
+        return re.compile("(?!)")
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in unique), flags)
+
+
+def _compile_globs(patterns):
+    """把多个 glob 合并成一个正则（匹配相对 posix 路径）"""
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    alternatives = "|".join(f"(?:{_glob_to_regex(p)})" for p in patterns)
+    return re.compile(f"(?:{alternatives})\\Z", flags)
+
+
+def _glob_to_regex(pattern):
+    parts = _split_glob(pattern)
+    regex = ""
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            # 中间的 ** 匹配零或多层目录；结尾的 ** 匹配其下所有文件
+            regex += ".*" if last else "(?:[^/]+/)*"
+        else:
+            regex += _segment_to_regex(part) + ("" if last else "/")
+    return regex
+
+
+def _segment_to_regex(part):
+    """单个路径段：* 和 ? 不跨越 /；[...] 的处理与 fnmatch.translate 相同"""
+    out = []
+    i, n = 0, len(part)
+    while i < n:
+        c = part[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and part[j] == "!":
+                j += 1
+            if j < n and part[j] == "]":
+                j += 1
+            j = part.find("]", j)
+            if j < 0:
+                out.append("\\[")
+                continue
+            out.append(_bracket_to_regex(part[i:j]))
+            i = j + 1
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _bracket_to_regex(body):
+    """[...] 中括号内的部分转成正则字符集
+
+    与 fnmatch.translate 一致：只有 ! 表示取反，开头的 ^ 和 [ 按字面处理，
+    - 表示范围（空范围去掉），& ~ | 转义以免被当成集合运算。取反的集合不匹配 /。
+    """
+    if "-" not in body:
+        stuff = body.replace("\\", "\\\\")
+    else:
+        chunks = []
+        i = 0
+        k = 2 if body.startswith("!") else 1
+        while True:
+            k = body.find("-", k)
+            if k < 0:
+                break
+            chunks.append(body[i:k])
+            i = k + 1
+            k = k + 3
+        chunk = body[i:]
+        if chunk:
+            chunks.append(chunk)
+        else:
+            chunks[-1] += "-"
+        # 去掉空范围（如 z-a），正则里是非法的
+        for k in range(len(chunks) - 1, 0, -1):
+            if chunks[k - 1][-1] > chunks[k][0]:
+                chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+                del chunks[k]
+        # 构成范围的 - 保留，其余的 - 和反斜杠转义
+        stuff = "-".join(s.replace("\\", "\\\\").replace("-", "\\-") for s in chunks)
+    stuff = re.sub(r"([&~|])", r"\\\1", stuff)
+
+    if not stuff:
+        # 空集合：永不匹配
+        return "(?!)"
+    if stuff == "!":
+        # 取反的空集合：匹配任意单个字符
+        return "[^/]"
+    if stuff[0] == "!":
+        return "[^" + stuff[1:] + "/]"
+    if stuff[0] in ("^", "["):
+        stuff = "\\" + stuff
+    return "[" + stuff + "]"
@@ -1,21 +1,67 @@
 from engine import node
 from utils.ast_parser import parse_file
+from utils.snapshot_store import RACY_WINDOW_NS
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+import sys
+import time
+
+# path -> (st_mtime_ns, st_size, language, ast, recorded_ns)：同一进程内多次运行复用
+_AST_CACHE = {}
+_loaded_cache_files = set()
 
 def parse_code_node():
-    """解析代码生成 AST 节点"""
+    """解析代码生成 AST 节点
+
+    文件的 mtime 和大小与上次解析时相同时直接复用缓存的 AST，未改动的文件只需一次 os.stat。
+    与快照 stat 索引相同的 racy 规则：记录时文件刚被修改过（RACY_WINDOW_NS 内）的条目不可信，重新解析。
+    params["cache_file"] 指定 pickle 文件时，缓存在多次运行之间持久化（默认不持久化，只在进程内有效）。
+    注意 pickle.load 可以执行任意代码：只能指向自己生成、他人无法写入的路径，
+    不要指向仓库里（可能随 checkout 带入）的文件。保存时只保留本次 files 中的条目。
+    params["workers"] 大于 1 时，未命中缓存的文件分给多个进程解析（AST 可以 pickle 传回）；
+    默认 1，在当前进程内依次解析。
+    """
     def prep(ctx, params):
         files = ctx.get("files", [])
         language = params.get("language", "auto")
-        return {"files": files, "language": language}
+        cache_file = params.get("cache_file")
+        if cache_file and cache_file not in _loaded_cache_files:
+            _AST_CACHE.update(_load_cache(cache_file))
+            _loaded_cache_files.add(cache_file)
+        return {"files": files, "language": language, "cache_file": cache_file}
 
     def exec(prep_result, params):
-        ast_results = []
-        for fp in prep_result["files"]:
+        files = prep_result["files"]
+        language = prep_result["language"]
+        ast_results = [None] * len(files)
+        misses = []
+        for i, fp in enumerate(files):
             try:
-                ast_obj = parse_file(fp, prep_result["language"])
-                ast_results.append({"path": fp, "ast": ast_obj, "success": True})
+                st = os.stat(fp)
             except Exception as e:
-                ast_results.append({"path": fp, "error": str(e), "success": False})
+                ast_results[i] = {"path": fp, "error": str(e), "success": False}
+                continue
+            key = (st.st_mtime_ns, st.st_size, language)
+            cached = _AST_CACHE.get(fp)
+            if (cached and len(cached) > 4 and cached[:3] == key
+                    and cached[4] - st.st_mtime_ns >= RACY_WINDOW_NS):
+                ast_results[i] = {"path": fp, "ast": cached[3], "success": True}
+            else:
+                # 在读取文件之前记录时间：解析期间发生的修改也会落在 racy 窗口内
+                misses.append((i, fp, key, time.time_ns()))
+
+        parsed = _parse_all([(fp, language) for _, fp, _, _ in misses], params.get("workers", 1))
+        for (i, fp, key, recorded_ns), (ast_obj, error) in zip(misses, parsed):
+            if error is None:
+                _AST_CACHE[fp] = key + (ast_obj, recorded_ns)
+                ast_results[i] = {"path": fp, "ast": ast_obj, "success": True}
+            else:
+                _AST_CACHE.pop(fp, None)
+                ast_results[i] = {"path": fp, "error": error, "success": False}
+
+        if misses and prep_result["cache_file"]:
+            _save_cache(prep_result["cache_file"], files)
         return ast_results
 
     def post(ctx, prep_result, exec_result, params):
@@ -24,3 +70,46 @@ def parse_code_node():
         return "parse_complete" if ctx["parsed_file_count"] > 0 else "parse_failed"
 
     return node(prep=prep, exec=exec, post=post)
+
+
+def _parse_one(job):
+    """子进程入口（需在模块顶层才能 pickle），返回 (ast, None) 或 (None, 错误信息)"""
+    fp, language = job
+    try:
+        return parse_file(fp, language), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _parse_all(jobs, workers=1):
+    """按原顺序返回每个 job 的解析结果"""
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_parse_one, jobs, chunksize=32))
+    return [_parse_one(job) for job in jobs]
+
+
+def _load_cache(cache_file):
+    """读取持久化的 AST 缓存；不存在、损坏或 Python 版本不同（AST 结构会变）时返回空字典"""
+    try:
+        with open(cache_file, "rb") as f:
+            data = pickle.load(f)
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("python") != sys.version_info[:2]:
+        return {}
+    return data.get("entries", {})
+
+
+def _save_cache(cache_file, files):
+    """只保存本次 files 的条目（已删除、改名的文件不会一直留在缓存里）；
+    先写临时文件再替换，中断时不会留下半个 pickle"""
+    entries = {fp: _AST_CACHE[fp] for fp in files if fp in _AST_CACHE}
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"python": sys.version_info[:2], "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"Warning: Could not save parse cache {cache_file}: {e}")
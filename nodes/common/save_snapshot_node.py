@@ -3,9 +3,8 @@
 """
 
 from engine import node
-import json
-from pathlib import Path
 from datetime import datetime
+from utils import json_io, snapshot_store
 
 
 def save_snapshot_node():
@@ -31,13 +30,19 @@ def save_snapshot_node():
         snapshot_data["llm_analysis"] = llm_response
 
         # 保存到 .ai-snapshots 目录
-        snapshots_dir = Path(".ai-snapshots")
+        snapshots_dir = snapshot_store.SNAPSHOTS_DIR
         snapshots_dir.mkdir(exist_ok=True)
 
         snapshot_file = snapshots_dir / f"snapshot-{timestamp}.json"
 
-        with open(snapshot_file, 'w', encoding='utf-8') as f:
-            json.dump(snapshot_data, f, indent=2, ensure_ascii=False)
+        json_io.dump(snapshot_data, snapshot_file, indent=True)
+
+        # 元数据单独存一份，snapshot-list 无需解析完整快照
+        meta_file = snapshots_dir / f"snapshot-{timestamp}.meta.json"
+        json_io.dump({
+            "timestamp": snapshot_data.get("timestamp", timestamp),
+            "file_count": len(snapshot_data.get("files", {}))
+        }, meta_file)
 
         # 同时保存 Markdown 报告
         md_file = snapshots_dir / f"snapshot-{timestamp}.md"
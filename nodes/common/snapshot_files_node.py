@@ -1,12 +1,14 @@
 """
 快照文件节点 - 保存文件内容和哈希值用于回滚
+
+文件正文按内容哈希写入对象库（utils.snapshot_store），快照数据只记录哈希和大小
 """
 
 from engine import node
-import json
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from utils import snapshot_store
 
 
 def snapshot_files_node():
@@ -17,12 +19,19 @@ def snapshot_files_node():
         project_root = ctx.get("project_root", ".")
         return {
             "files": files,
-            "project_root": project_root
+            "project_root": project_root,
+            "objects_dir": params.get("objects_dir", snapshot_store.OBJECTS_DIR),
+            "hash_algo": params.get("hash_algo", snapshot_store.default_hash_algo()),
+            # None: 自动选择；"none": 不压缩，用磁盘空间换快照/恢复速度
+            "compression": params.get("compression")
         }
 
     def exec(prep_result, params):
         files = prep_result["files"]
         project_root = prep_result["project_root"]
+        objects_dir = prep_result["objects_dir"]
+        hash_algo = prep_result["hash_algo"]
+        compression = prep_result["compression"]
 
         snapshot_data = {
             "timestamp": datetime.now().isoformat(),
@@ -30,23 +39,17 @@ def snapshot_files_node():
             "files": {}
         }
 
-        for file_path in files:
-            try:
-                full_path = Path(project_root) / file_path
-                if full_path.exists() and full_path.is_file():
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    # 计算文件哈希
-                    file_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-
-                    snapshot_data["files"][str(file_path)] = {
-                        "content": content,
-                        "hash": file_hash,
-                        "size": len(content)
-                    }
-            except Exception as e:
-                print(f"Warning: Failed to snapshot {file_path}: {e}")
+        # 读取、哈希、压缩、写对象都会释放 GIL，按文件并行
+        with ThreadPoolExecutor(max_workers=snapshot_store.MAX_WORKERS) as executor:
+            entries = executor.map(
+                lambda file_path: _snapshot_one(
+                    Path(project_root) / file_path, objects_dir, hash_algo, compression
+                ),
+                files
+            )
+            for file_path, entry in zip(files, entries):
+                if entry is not None:
+                    snapshot_data["files"][str(file_path)] = entry
 
         return {
             "snapshot_data": snapshot_data,
@@ -59,3 +62,27 @@ def snapshot_files_node():
         return "snapshot_created"
 
     return node(prep=prep, exec=exec, post=post)
+
+
+def _snapshot_one(full_path, objects_dir, hash_algo, compression=None):
+    """保存单个文件到对象库，返回清单条目；文件不存在或读取失败时返回 None"""
+    try:
+        if not (full_path.exists() and full_path.is_file()):
+            return None
+        data = full_path.read_bytes()
+
+        # 计算文件哈希，同时作为对象库中的键
+        hasher = snapshot_store.new_hasher(hash_algo)
+        hasher.update(data)
+        file_hash = hasher.hexdigest()
+        compression = snapshot_store.write_object(data, file_hash, objects_dir, compression)
+
+        return {
+            "hash": file_hash,
+            "hash_algo": hash_algo,
+            "size": len(data),
+            "compression": compression
+        }
+    except Exception as e:
+        print(f"Warning: Failed to snapshot {full_path}: {e}")
+        return None
@@ -1,11 +1,15 @@
 from engine import node
-import json, os
+from utils import json_io
+import os
 
 def _safe_ts():
     return "20251017_224355"
 
 def write_file_node():
-    """写入文件节点"""
+    """写入文件节点
+
+    params["fsync"] 为 True 时写完后 fsync，保证落盘（默认关闭）
+    """
     def prep(ctx, params):
         output_path = params.get("output_path", "output.json")
         output_path = output_path.replace("{timestamp}", _safe_ts())
@@ -16,11 +20,16 @@ def write_file_node():
     def exec(prep_result, params):
         try:
             os.makedirs(os.path.dirname(prep_result["output_path"]) or ".", exist_ok=True)
-            with open(prep_result["output_path"], "w", encoding="utf-8") as f:
-                if prep_result["format"] == "json":
-                    json.dump(prep_result["data"], f, indent=2, ensure_ascii=False, default=str)
-                else:
-                    f.write(str(prep_result["data"]))
+            # 先在内存里序列化为 UTF-8 bytes（有 orjson 时用 orjson），再一次写入
+            if prep_result["format"] == "json":
+                payload = json_io.dumps(prep_result["data"], indent=True)
+            else:
+                payload = str(prep_result["data"]).encode("utf-8")
+            with open(prep_result["output_path"], "wb", buffering=1 << 20) as f:
+                f.write(payload)
+                if params.get("fsync", False):
+                    f.flush()
+                    os.fsync(f.fileno())
             return {"success": True, "path": prep_result["output_path"]}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -6,8 +6,8 @@ setup(
     description="Pluggable repository analysis framework",
     author="Your Name",
     packages=find_packages(),
+    python_requires=">=3.8",
     install_requires=[
-        "click>=8.0.0",
         "pyyaml>=6.0.0",
         "requests>=2.28.0",
         "gitpython>=3.1.0",
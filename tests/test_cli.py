@@ -0,0 +1,92 @@
+"""
+Tests for the snapshot CLI commands: cached snapshot-list output and restore
+"""
+
+import json
+import os
+import time
+
+import cli
+from utils import snapshot_store
+
+
+def _write_snapshot(snapshots_dir, snapshot_id, file_count):
+    (snapshots_dir / f"snapshot-{snapshot_id}.json").write_text(json.dumps({"files": {}}))
+    (snapshots_dir / f"snapshot-{snapshot_id}.meta.json").write_text(
+        json.dumps({"timestamp": snapshot_id, "file_count": file_count})
+    )
+
+
+def _age(path, seconds=10):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_snapshot_list_cache(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    snapshots_dir = tmp_path / snapshot_store.SNAPSHOTS_DIR
+    snapshots_dir.mkdir()
+    _write_snapshot(snapshots_dir, "20250101_000000", 3)
+
+    scans = []
+    real_list = snapshot_store.list_snapshots
+    monkeypatch.setattr(snapshot_store, "list_snapshots", lambda d: scans.append(d) or real_list(d))
+
+    # First run: no cache yet. The one it saves is racy because the
+    # directory was modified just before, so the next run rescans too
+    cli.snapshot_list()
+    first = capsys.readouterr().out
+    assert "[20250101_000000] 20250101_000000 - 3 files" in first
+    assert len(scans) == 1
+    cli.snapshot_list()
+    assert capsys.readouterr().out == first
+    assert len(scans) == 2
+
+    # Directory older than the racy window: the cache saved now is trusted
+    _age(snapshots_dir)
+    cli.snapshot_list()
+    assert len(scans) == 3
+    cli.snapshot_list()
+    assert capsys.readouterr().out == first + first
+    assert len(scans) == 3
+
+    # A new snapshot changes the directory mtime and invalidates the cache
+    _write_snapshot(snapshots_dir, "20250102_000000", 5)
+    cli.snapshot_list()
+    out = capsys.readouterr().out
+    assert len(scans) == 4
+    assert out.index("[20250102_000000]") < out.index("[20250101_000000]")
+    assert "20250102_000000 - 5 files" in out
+
+
+def test_restore_legacy_entries_without_hash(tmp_path, monkeypatch, capsys):
+    # Legacy inline-content entries may have no hash; they must not be
+    # treated as duplicates of each other
+    monkeypatch.chdir(tmp_path)
+    snapshots_dir = tmp_path / snapshot_store.SNAPSHOTS_DIR
+    snapshots_dir.mkdir()
+    manifest = {"files": {"a.txt": {"content": "AAA"}, "b.txt": {"content": "BBB"}}}
+    (snapshots_dir / "snapshot-20250101_000000.json").write_text(json.dumps(manifest))
+
+    cli.snapshot_restore("20250101_000000")
+    assert "Restored 2 files" in capsys.readouterr().out
+    assert (tmp_path / "a.txt").read_text() == "AAA"
+    assert (tmp_path / "b.txt").read_text() == "BBB"
+
+
+def test_restore_prunes_stat_index(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    snapshots_dir = tmp_path / snapshot_store.SNAPSHOTS_DIR
+    snapshots_dir.mkdir()
+    manifest = {"files": {"a.txt": {"content": "AAA"}}}
+    (snapshots_dir / "snapshot-20250101_000000.json").write_text(json.dumps(manifest))
+    (tmp_path / "other.txt").write_text("x")
+    snapshot_store.save_stat_index({
+        "gone.txt": [1, 2, 3, "sha256", "0" * 64, 4],
+        "other.txt": [1, 2, 3, "sha256", "0" * 64, 4],
+    })
+
+    cli.snapshot_restore("20250101_000000")
+    capsys.readouterr()
+    # Paths outside the restored manifest (deleted or not) are dropped
+    assert list(snapshot_store.load_stat_index()) == ["a.txt"]
@@ -1,5 +1,17 @@
+import fnmatch
+import os
+import tempfile
+import threading
+import time
 import unittest
+import warnings
+from pathlib import Path
+from unittest import mock
+from engine import flow, node
+from utils import llm_client
 from nodes.common.get_files_node import get_files_node
+from nodes.common.call_llm_node import call_llm_node
+from nodes.common.parse_code_node import parse_code_node
 
 class TestGetFilesNode(unittest.TestCase):
     def test_get_files(self):
@@ -10,5 +22,144 @@ class TestGetFilesNode(unittest.TestCase):
         result = n['exec'](prep, params)
         self.assertIsInstance(result, list)
 
+    def _run(self, root, params):
+        n = get_files_node()
+        prep = n['prep']({'project_root': root}, params)
+        return n['exec'](prep, params)
+
+    @staticmethod
+    def _glob_reference(root, patterns, exclude, exts):
+        # 改写前的实现：Path.glob + 逐条 fnmatch
+        root = Path(root).resolve()
+        found = set()
+        for pattern in patterns:
+            for path in root.glob(pattern):
+                if not path.is_file():
+                    continue
+                rel = path.relative_to(root).as_posix()
+                if any(fnmatch.fnmatch(rel, ex) or fnmatch.fnmatch(rel, ex.rstrip('/**')) for ex in exclude):
+                    continue
+                if exts and path.suffix not in exts:
+                    continue
+                found.add(str(path.resolve()))
+        return sorted(found)
+
+    def test_matches_path_glob(self):
+        layout = [
+            'a.py', 'b.py', '^.py', '[x.py', 'readme.md', 'setup.cfg',
+            'src/app.py', 'src/util.js', 'src/pkg/mod.py', 'src/pkg/deep/x.py',
+            'tests/test_a.py', 'tests/data/fixture.json',
+            'node_modules/lib/index.js', '.git/config', 'build/out.py',
+        ]
+        cases = [
+            (['**/*'], ['node_modules/**', '.git/**'], []),
+            (['**/*.py'], ['build/**'], []),
+            (['*.py'], [], []),
+            (['src/*/*.py', 'tests/*.py'], [], []),
+            (['src/**/*.py', 'src/pkg/*.py'], [], []),
+            (['[ab].py', '[^a].py', '[!a].py', '[[]x.py', '[a-c]*'], [], []),
+            (['**/*'], ['node_modules/**', 'src/pkg/**', '*.md'], ['.py', '.js']),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            for rel in layout:
+                path = Path(tmp, rel)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text('x')
+            for patterns, exclude, exts in cases:
+                params = {'patterns': patterns, 'exclude': exclude, 'extensions': exts}
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error')
+                    result = self._run(tmp, params)
+                self.assertEqual(result, self._glob_reference(tmp, patterns, exclude, exts), params)
+
+            # 结尾的 ** 返回其下所有文件（Path.glob 只返回目录）
+            result = self._run(tmp, {'patterns': ['tests/**'], 'exclude': []})
+            self.assertEqual(
+                [os.path.relpath(p, os.path.realpath(tmp)) for p in result],
+                [os.path.join('tests', 'data', 'fixture.json'), os.path.join('tests', 'test_a.py')]
+            )
+
+class TestParseCodeNode(unittest.TestCase):
+    def test_cache_skips_racy_entries(self):
+        n = parse_code_node()
+        params = {'language': 'python'}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'mod.py')
+            Path(path).write_text('def f():\n    pass\n')
+            ctx = {'files': [path]}
+            run = lambda: n['exec'](n['prep'](ctx, params), params)[0]['ast']
+
+            # 刚写入的文件：缓存条目处于 racy 窗口内，下次仍重新解析
+            self.assertIsNot(run(), run())
+
+            # mtime 足够早之后才复用缓存的 AST
+            old = time.time() - 10
+            os.utime(path, (old, old))
+            first = run()
+            self.assertIs(run(), first)
+
+class TestCallLLMNode(unittest.TestCase):
+    def test_batch_prompts(self):
+        n = call_llm_node()
+        ctx = {'items': [{'name': 'a'}, {'name': 'b'}, 'raw prompt'], 'lang': 'python'}
+        params = {'prompt_template': 'Review {name} ({lang})', 'batch_key': 'items', 'concurrency': 2}
+        prep = n['prep'](ctx, params)
+        self.assertEqual(prep['prompt'], ['Review a (python)', 'Review b (python)', 'raw prompt'])
+
+        with mock.patch('nodes.common.call_llm_node.call_llm', side_effect=lambda prompt, **kw: prompt.upper()):
+            result = n['exec'](prep, params)
+        self.assertEqual(n['post'](ctx, prep, result, params), 'llm_complete')
+        self.assertEqual(ctx['llm_responses'], ['REVIEW A (PYTHON)', 'REVIEW B (PYTHON)', 'RAW PROMPT'])
+
+    def test_async_batch_without_api_key(self):
+        n = call_llm_node()
+        ctx = {'items': ['first', 'second']}
+        params = {'batch_key': 'items', 'use_async': True, 'concurrency': 1}
+        prep = n['prep'](ctx, params)
+        with mock.patch.dict('os.environ', {'OPENAI_API_KEY': ''}):
+            result = n['exec'](prep, params)
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['responses']), 2)
+        self.assertTrue(result['responses'][0].endswith('first...'))
+        self.assertTrue(result['responses'][1].endswith('second...'))
+
+class TestLLMCache(unittest.TestCase):
+    def test_cached_call(self):
+        calls = []
+        def request():
+            calls.append(1)
+            return 'response'
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(llm_client, 'CACHE_DB', Path(tmp) / 'cache.db'), \
+                mock.patch.object(llm_client, '_local', threading.local()):
+            for _ in range(2):
+                self.assertEqual(llm_client._cached_call('p', 'gpt-4', 0.2, 100, request), 'response')
+            self.assertEqual(len(calls), 1)
+            # 参数不同视为不同请求
+            llm_client._cached_call('p', 'gpt-4', 0.5, 100, request)
+            self.assertEqual(len(calls), 2)
+            llm_client._local.conn.close()
+
+class TestFlow(unittest.TestCase):
+    def test_independent_nodes_run_concurrently(self):
+        # 两个节点都要等到对方也进入 exec 才能通过；串行执行会超时
+        barrier = threading.Barrier(2, timeout=5)
+        def producer(key):
+            def exec(prep_result, params):
+                barrier.wait()
+                return key
+            def post(ctx, prep_result, exec_result, params):
+                ctx[key] = exec_result
+            return node(exec=exec, post=post)
+        def post_join(ctx, prep_result, exec_result, params):
+            ctx['joined'] = ctx['a'] + ctx['b']
+
+        f = flow()
+        f.add(producer('a'), name='a', reads=[], writes=['a'])
+        f.add(producer('b'), name='b', reads=[], writes=['b'])
+        f.add(node(post=post_join), name='join', reads=['a', 'b'], writes=['joined'])
+        self.assertEqual(f.run({})['joined'], 'ab')
+
 if __name__ == '__main__':
     unittest.main()
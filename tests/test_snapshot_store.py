@@ -0,0 +1,98 @@
+"""
+Tests for the content-addressed snapshot store
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from utils import snapshot_store
+
+
+def test_write_and_restore_object():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        objects_dir = tmpdir / "objects"
+        data = "print('héllo')\n".encode("utf-8")
+        file_hash = hashlib.sha256(data).hexdigest()
+
+        compression = snapshot_store.write_object(data, file_hash, objects_dir)
+        assert snapshot_store.object_path(file_hash, compression, objects_dir).exists()
+
+        # Identical content is stored once
+        assert snapshot_store.write_object(data, file_hash, objects_dir) == compression
+        assert len(list(objects_dir.rglob("*"))) == 2  # fan-out dir + object
+
+        target = tmpdir / "restored.py"
+        file_data = {"hash": file_hash, "size": len(data), "compression": compression}
+        assert snapshot_store.restore_file(target, file_data, objects_dir) == snapshot_store.RESTORED
+        assert target.read_bytes() == data
+
+        # Unchanged targets are verified, not rewritten
+        stat_index = {}
+        assert snapshot_store.restore_file(target, file_data, objects_dir, stat_index) == snapshot_store.UNCHANGED
+        assert stat_index[target][3:5] == ["sha256", file_hash]
+
+
+def test_restore_legacy_embedded_content():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = Path(tmpdir) / "legacy.py"
+        content = "x = 1\n"
+        file_data = {"content": content, "hash": hashlib.sha256(content.encode()).hexdigest()}
+
+        assert snapshot_store.restore_file(target, file_data) == snapshot_store.RESTORED
+        assert target.read_text(encoding="utf-8") == content
+
+        file_data["hash"] = "0" * 64
+        assert snapshot_store.restore_file(target, file_data) == snapshot_store.MISMATCH
+
+
+def test_copy_restored_duplicate():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        content = "# shared header\n"
+        file_data = {"content": content, "hash": hashlib.sha256(content.encode()).hexdigest()}
+        first, second = str(tmpdir / "a.py"), str(tmpdir / "b.py")
+
+        stat_index = {}
+        status = snapshot_store.restore_file(first, file_data, stat_index=stat_index)
+        assert snapshot_store.copy_restored(first, second, file_data, status, stat_index) == snapshot_store.RESTORED
+        assert Path(second).read_text(encoding="utf-8") == content
+        assert stat_index[second][3:5] == stat_index[first][3:5]
+
+        # Already matching copies are left alone
+        assert snapshot_store.copy_restored(first, second, file_data, status, stat_index) == snapshot_store.UNCHANGED
+
+
+def test_stat_index_ignores_racy_entries():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = Path(tmpdir) / "racy.py"
+        content = "a = 1\n"
+        file_data = {"content": content, "hash": hashlib.sha256(content.encode()).hexdigest()}
+
+        stat_index = {}
+        assert snapshot_store.restore_file(target, file_data, stat_index=stat_index) == snapshot_store.RESTORED
+
+        # Same size, same inode and mtime, different content: the entry was
+        # recorded right after the write, so it must not be trusted
+        st = target.stat()
+        target.write_text("b = 2\n", encoding="utf-8")
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert snapshot_store.restore_file(target, file_data, stat_index=stat_index) == snapshot_store.RESTORED
+        assert target.read_text(encoding="utf-8") == content
+
+        # Once recorded well after the mtime, the cached hash is used as is
+        entry = stat_index[target]
+        entry[5] = entry[1] + snapshot_store.RACY_WINDOW_NS
+        assert snapshot_store.restore_file(target, file_data, stat_index=stat_index) == snapshot_store.UNCHANGED
+
+
+def test_current_hash_without_file_digest(monkeypatch):
+    # hashlib.file_digest only exists on Python 3.11+
+    monkeypatch.delattr(hashlib, "file_digest", raising=False)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = Path(tmpdir) / "big.bin"
+        data = os.urandom(3 * (1 << 20) + 123)
+        target.write_bytes(data)
+        assert snapshot_store._current_hash(target) == hashlib.sha256(data).hexdigest()
@@ -14,6 +14,6 @@ def detect_language(file_path):
     return language_map.get(suffix, 'unknown')
 
 def parse_python(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        code = f.read()
+    # 直接把 bytes 交给 ast.parse：省去文本层解码，编码按 PEP 263 声明 / BOM 识别（默认 UTF-8）
+    code = Path(file_path).read_bytes()
     return ast.parse(code, filename=file_path)
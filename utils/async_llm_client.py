@@ -0,0 +1,139 @@
+"""
+异步 LLM 客户端：与 utils.llm_client 返回值一致，基于 AsyncAnthropic / AsyncOpenAI
+
+一次发出几十个以上的 prompt 时，线程池里每个线程都阻塞在 socket 上；
+这里在单个事件循环里同时挂起全部请求，用 Semaphore 限制在途请求数以避免触发限流。
+响应缓存与 utils.llm_client 共用 .ai-snapshots/.llm_cache.db。
+"""
+
+import asyncio
+import os
+
+from utils import llm_client
+
+_PROVIDERS = {
+    # provider: (API key 环境变量, 显示名称, pip 包名)
+    'anthropic': ('ANTHROPIC_API_KEY', 'Anthropic', 'anthropic'),
+    'openai': ('OPENAI_API_KEY', 'OpenAI', 'openai'),
+}
+
+
+async def call_llm(prompt, model='gpt-4', temperature=0.2, max_tokens=2000, clients=None):
+    """
+    异步调用 LLM API
+
+    返回值（包括没有 API key 时的 mock 文本和错误文本）与 llm_client.call_llm 相同。
+    clients 为 call_llm_batch 内共享的客户端集合；单独调用时省略，用完即关闭。
+    """
+    if clients is None:
+        clients = _Clients()
+        try:
+            return await call_llm(prompt, model, temperature, max_tokens, clients=clients)
+        finally:
+            await clients.aclose()
+
+    provider = 'anthropic' if model.startswith('claude') else 'openai'
+    env_var, label, package = _PROVIDERS[provider]
+    api_key = os.getenv(env_var)
+
+    if not api_key:
+        return f"[Mock LLM Response - {label} API key not found]\n\nPrompt preview:\n{prompt[:200]}..."
+
+    key = llm_client._cache_key(prompt, model, temperature, max_tokens)
+    cached = llm_client._cache_get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        client = clients.get(provider, api_key)
+        response = await _request(client, provider, prompt, model, temperature, max_tokens)
+    except ImportError:
+        return f"[Error] {package} package not installed. Run: pip install {package}\n\nPrompt preview:\n{prompt[:200]}..."
+    except Exception as e:
+        return f"[Error calling {label} API] {str(e)}\n\nPrompt preview:\n{prompt[:200]}..."
+
+    llm_client._cache_put(key, response)
+    return response
+
+
+async def call_llm_batch(prompts, model='gpt-4', temperature=0.2, max_tokens=2000, concurrency=32):
+    """并发调用，结果按 prompts 顺序返回；同时在途的请求不超过 concurrency 个"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    clients = _Clients()
+
+    async def one(prompt):
+        async with semaphore:
+            return await call_llm(prompt, model, temperature, max_tokens, clients=clients)
+
+    try:
+        return await asyncio.gather(*(one(p) for p in prompts))
+    finally:
+        await clients.aclose()
+
+
+class _Clients:
+    """一次批量调用内按 provider 复用客户端
+
+    异步客户端的连接池绑定在事件循环上，不能像同步客户端那样跨 asyncio.run 全局缓存。
+    """
+
+    def __init__(self):
+        self._clients = {}
+
+    def get(self, provider, api_key):
+        client = self._clients.get(provider)
+        if client is None:
+            client = self._clients[provider] = _new_client(provider, api_key)
+        return client
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+
+def _new_client(provider, api_key):
+    # 先导入 SDK：导入失败时不会留下未关闭的 httpx.AsyncClient
+    if provider == 'anthropic':
+        import anthropic
+        client_cls = anthropic.AsyncAnthropic
+    else:
+        import openai
+        client_cls = openai.AsyncOpenAI
+
+    http_client = _http_client()
+    if http_client is None:
+        return client_cls(api_key=api_key)
+    return client_cls(api_key=api_key, http_client=http_client)
+
+
+def _http_client():
+    """与 llm_client 同一套连接池参数（异步版）；httpx 不可用时返回 None"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx.AsyncClient(**llm_client._http_pool_options(httpx))
+
+
+async def _request(client, provider, prompt, model, temperature, max_tokens):
+    if provider == 'anthropic':
+        message = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        return message.content[0].text
+
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    return response.choices[0].message.content
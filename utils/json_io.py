@@ -0,0 +1,53 @@
+"""
+JSON 读写：安装了 orjson 时使用 orjson，否则回退到标准库 json
+
+输出统一为 UTF-8（不转义非 ASCII），无法序列化的对象按 str() 处理。
+datetime / date / time 和 dataclass 在 orjson 下也走 str()（与标准库输出相同，
+如 "2025-01-01 12:00:00"）；orjson 不支持的值（如超过 64 位的整数）自动改用标准库 json。
+
+仍与标准库不同的只有：NaN / Infinity 输出为 null（标准库输出非标准 JSON 的 NaN），
+普通 Enum 成员输出为其 value（标准库为 str()，如 "Color.RED"）。
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj, indent=False):
+    """序列化为 UTF-8 bytes"""
+    if orjson is not None:
+        # 这些类型交给 default=str，与标准库回退的输出一致
+        option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                  | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=str, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        obj, indent=2 if indent else None, ensure_ascii=False, default=str
+    ).encode('utf-8')
+
+
+def loads(data):
+    """从 bytes 或 str 反序列化"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump(obj, path, indent=False):
+    """序列化并一次性写入文件"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def load(path):
+    """一次性读入文件并反序列化"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
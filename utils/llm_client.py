@@ -1,9 +1,23 @@
 """
 LLM 客户端：支持 OpenAI 和 Anthropic Claude API
+
+成功的 API 响应缓存在 .ai-snapshots/.llm_cache.db（SQLite），相同的
+model / temperature / max_tokens / prompt 再次调用时直接返回缓存结果。
 """
 
 import os
 import json
+import functools
+import hashlib
+import importlib.util
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_DB = Path(".ai-snapshots") / ".llm_cache.db"
+
+_local = threading.local()
 
 
 def call_llm(prompt, model='gpt-4', temperature=0.2, max_tokens=2000):
@@ -17,6 +31,7 @@ def call_llm(prompt, model='gpt-4', temperature=0.2, max_tokens=2000):
     环境变量：
     - OPENAI_API_KEY: OpenAI API 密钥
     - ANTHROPIC_API_KEY: Anthropic API 密钥
+    - LLM_CACHE: 设为 0 时不使用响应缓存
     """
 
     # 检查是否使用 Claude
@@ -26,6 +41,47 @@ def call_llm(prompt, model='gpt-4', temperature=0.2, max_tokens=2000):
         return _call_openai(prompt, model, temperature, max_tokens)
 
 
+def _http_pool_options(httpx):
+    """httpx 连接池参数，同步客户端与 utils.async_llm_client 共用
+
+    安装了 h2 时启用 HTTP/2，批量并发请求复用同一条连接；连接数上限与批量并发相匹配。
+    """
+    return {
+        "http2": importlib.util.find_spec("h2") is not None,
+        "timeout": 60.0,
+        "limits": httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    }
+
+
+def _http_client():
+    """SDK 使用的 httpx 客户端；httpx（SDK 自带依赖）不可用时返回 None，由 SDK 使用默认客户端"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx.Client(**_http_pool_options(httpx))
+
+
+@functools.lru_cache(maxsize=None)
+def _anthropic_client(api_key):
+    """按 API key 复用客户端：连接池（keep-alive）在多次、多线程调用间共享"""
+    import anthropic
+    http_client = _http_client()
+    if http_client is None:
+        return anthropic.Anthropic(api_key=api_key)
+    return anthropic.Anthropic(api_key=api_key, http_client=http_client)
+
+
+@functools.lru_cache(maxsize=None)
+def _openai_client(api_key):
+    """按 API key 复用客户端：连接池（keep-alive）在多次、多线程调用间共享"""
+    import openai
+    http_client = _http_client()
+    if http_client is None:
+        return openai.OpenAI(api_key=api_key)
+    return openai.OpenAI(api_key=api_key, http_client=http_client)
+
+
 def _call_anthropic(prompt, model, temperature, max_tokens):
     """调用 Anthropic Claude API"""
     api_key = os.getenv('ANTHROPIC_API_KEY')
@@ -33,10 +89,8 @@ def _call_anthropic(prompt, model, temperature, max_tokens):
     if not api_key:
         return f"[Mock LLM Response - Anthropic API key not found]\n\nPrompt preview:\n{prompt[:200]}..."
 
-    try:
-        import anthropic
-
-        client = anthropic.Anthropic(api_key=api_key)
+    def request():
+        client = _anthropic_client(api_key)
 
         print(f"\n{'='*60}")
         print(f"🔵 Calling Anthropic API")
@@ -63,6 +117,8 @@ def _call_anthropic(prompt, model, temperature, max_tokens):
 
         return message.content[0].text
 
+    try:
+        return _cached_call(prompt, model, temperature, max_tokens, request)
     except ImportError:
         return f"[Error] anthropic package not installed. Run: pip install anthropic\n\nPrompt preview:\n{prompt[:200]}..."
     except Exception as e:
@@ -76,10 +132,8 @@ def _call_openai(prompt, model, temperature, max_tokens):
     if not api_key:
         return f"[Mock LLM Response - OpenAI API key not found]\n\nPrompt preview:\n{prompt[:200]}..."
 
-    try:
-        import openai
-
-        client = openai.OpenAI(api_key=api_key)
+    def request():
+        client = _openai_client(api_key)
 
         response = client.chat.completions.create(
             model=model,
@@ -92,7 +146,66 @@ def _call_openai(prompt, model, temperature, max_tokens):
 
         return response.choices[0].message.content
 
+    try:
+        return _cached_call(prompt, model, temperature, max_tokens, request)
     except ImportError:
         return f"[Error] openai package not installed. Run: pip install openai\n\nPrompt preview:\n{prompt[:200]}..."
     except Exception as e:
         return f"[Error calling OpenAI API] {str(e)}\n\nPrompt preview:\n{prompt[:200]}..."
+
+
+def _cache_conn():
+    """每个线程一个连接（批量调用会并发访问）；WAL 模式下读写互不阻塞"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB, isolation_level=None, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def _cached_call(prompt, model, temperature, max_tokens, fn):
+    """命中缓存时直接返回，否则调用 fn() 并保存结果
+
+    只有 fn 正常返回的响应会被缓存；fn 抛出的异常原样向上传递。
+    缓存库不可用（只读目录、文件损坏等）时退化为直接调用。
+    """
+    key = _cache_key(prompt, model, temperature, max_tokens)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    response = fn()
+    _cache_put(key, response)
+    return response
+
+
+def _cache_key(prompt, model, temperature, max_tokens):
+    return hashlib.sha256(f"{model}|{temperature}|{max_tokens}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def _cache_get(key):
+    """返回缓存的响应；未命中、缓存关闭或缓存库不可用时返回 None"""
+    if os.getenv('LLM_CACHE') == '0':
+        return None
+    try:
+        row = _cache_conn().execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+    except (sqlite3.Error, OSError):
+        return None
+    return row[0] if row is not None else None
+
+
+def _cache_put(key, response):
+    if os.getenv('LLM_CACHE') == '0':
+        return
+    try:
+        _cache_conn().execute(
+            "INSERT OR REPLACE INTO cache (key, response, ts) VALUES (?, ?, ?)",
+            (key, response, int(time.time()))
+        )
+    except (sqlite3.Error, OSError):
+        pass
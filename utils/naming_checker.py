@@ -1,31 +1,33 @@
 import re
 import ast
 
+_PATTERNS = {
+    'kebab-case': re.compile(r'^[a-z][a-z0-9]*(-[a-z0-9]+)*$'),
+    'snake_case': re.compile(r'^[a-z][a-z0-9]*(_[a-z0-9]+)*$'),
+    'camelCase': re.compile(r'^[a-z][a-zA-Z0-9]*$'),
+    'PascalCase': re.compile(r'^[A-Z][a-zA-Z0-9]*$'),
+    'UPPER_SNAKE_CASE': re.compile(r'^[A-Z][A-Z0-9]*(_[A-Z0-9]+)*$'),
+}
+
 def check_naming_convention(ast_tree, rules):
-    violations = []
-    # 类名
-    if 'class' in rules:
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.ClassDef):
-                if not matches_convention(node.name, rules['class']):
-                    violations.append({'type':'class','name':node.name,'line':node.lineno,'expected':rules['class']})
-    # 函数名
-    if 'function' in rules:
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.FunctionDef):
-                if not matches_convention(node.name, rules['function']):
-                    violations.append({'type':'function','name':node.name,'line':node.lineno,'expected':rules['function']})
-    return violations
+    # 只遍历一次 AST；结果仍按先类名、后函数名排列
+    class_violations = []
+    function_violations = []
+    class_rule = rules.get('class')
+    function_rule = rules.get('function')
+    for node in ast.walk(ast_tree):
+        # 类名
+        if isinstance(node, ast.ClassDef):
+            if 'class' in rules and not matches_convention(node.name, class_rule):
+                class_violations.append({'type':'class','name':node.name,'line':node.lineno,'expected':class_rule})
+        # 函数名（含 async def）
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if 'function' in rules and not matches_convention(node.name, function_rule):
+                function_violations.append({'type':'function','name':node.name,'line':node.lineno,'expected':function_rule})
+    return class_violations + function_violations
 
 def matches_convention(name, convention):
-    patterns = {
-        'kebab-case': r'^[a-z][a-z0-9]*(-[a-z0-9]+)*$',
-        'snake_case': r'^[a-z][a-z0-9]*(_[a-z0-9]+)*$',
-        'camelCase': r'^[a-z][a-zA-Z0-9]*$',
-        'PascalCase': r'^[A-Z][a-zA-Z0-9]*$',
-        'UPPER_SNAKE_CASE': r'^[A-Z][A-Z0-9]*(_[A-Z0-9]+)*$',
-    }
-    pattern = patterns.get(convention)
+    pattern = _PATTERNS.get(convention)
     if not pattern:
         return True
-    return bool(re.match(pattern, name))
+    return bool(pattern.match(name))
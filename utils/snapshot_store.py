@@ -0,0 +1,340 @@
+"""
+快照存储：清单 + 按内容寻址的对象库
+
+布局（与 git objects 类似）：
+- .ai-snapshots/snapshot-<id>.json           清单，files 只记录 {hash, hash_algo, size, compression}
+- .ai-snapshots/objects/<hash[:2]>/<hash[2:]> 文件正文；安装 zstandard 时以 .zst 压缩保存
+- .ai-snapshots/objects/index                 工作区文件 stat -> 哈希缓存，恢复时跳过未改动的文件（只保留最近一次恢复的路径）
+
+相同内容只保存一份；旧版快照（files 里直接内嵌 content）仍可读取和恢复。
+哈希算法在安装 blake3 时默认用 BLAKE3，否则用 SHA-256；没有 hash_algo 字段的条目按 SHA-256 处理。
+"""
+
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from utils import json_io
+
+SNAPSHOTS_DIR = Path(".ai-snapshots")
+OBJECTS_DIR = SNAPSHOTS_DIR / "objects"
+INDEX_FILE = OBJECTS_DIR / "index"
+
+# restore_file 的返回值
+RESTORED = "restored"
+UNCHANGED = "unchanged"
+MISMATCH = "mismatch"
+
+# 快照读写以 I/O 为主，hashlib 与 zstd 在计算时也会释放 GIL
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+_CHUNK_SIZE = 1 << 20
+
+# mtime 精度不足时（部分文件系统只到秒），刚写入/刚改过的文件与记录时的 stat 无法区分，不信任
+RACY_WINDOW_NS = 2_000_000_000
+_SUFFIXES = {"zstd": ".zst", "none": ""}
+
+
+def _blake3():
+    """blake3 为可选依赖，未安装时返回 None"""
+    try:
+        import blake3
+    except ImportError:
+        return None
+    return blake3
+
+
+def default_hash_algo():
+    """新快照使用的哈希算法：BLAKE3 比软件 SHA-256 快数倍，可用时优先"""
+    return "blake3" if _blake3() else "sha256"
+
+
+def new_hasher(hash_algo="sha256"):
+    """创建哈希对象（update / digest / hexdigest 接口）"""
+    if hash_algo == "blake3":
+        blake3 = _blake3()
+        if blake3 is None:
+            raise RuntimeError("blake3 package not installed. Run: pip install blake3")
+        return blake3.blake3()
+    return hashlib.new(hash_algo)
+
+
+def _zstd():
+    """zstandard 为可选依赖，未安装时返回 None"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def object_path(file_hash, compression="none", objects_dir=OBJECTS_DIR):
+    """对象文件路径：objects/<hash[:2]>/<hash[2:]>[.zst]"""
+    return Path(objects_dir) / file_hash[:2] / (file_hash[2:] + _SUFFIXES[compression])
+
+
+def write_object(data, file_hash, objects_dir=OBJECTS_DIR, compression=None):
+    """保存文件正文，返回实际使用的压缩方式
+
+    compression 为 None 时自动选择（有 zstandard 用 zstd，否则不压缩）；
+    传 "none" 则原样存储，恢复时只是一次 read + write。
+    对象已存在（任一压缩方式）时直接复用，不重复写入。
+    """
+    for existing in _SUFFIXES:
+        if object_path(file_hash, existing, objects_dir).exists():
+            return existing
+
+    if compression is None:
+        compression = "zstd" if _zstd() else "none"
+    zstandard = _zstd() if compression == "zstd" else None
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("zstandard package not installed. Run: pip install zstandard")
+    path = object_path(file_hash, compression, objects_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 先写临时文件再原子替换，避免并发快照（或同一快照里的重复内容）看到半个对象
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, 'wb') as f:
+        if zstandard:
+            with zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False) as writer:
+                writer.write(data)
+        else:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return compression
+
+
+def iter_snapshot_files(snapshot_file):
+    """逐条产出快照中的 (file_path, file_data)
+
+    安装了 ijson 时流式解析，内存占用只与单个文件相关；否则整体加载
+    """
+    with open(snapshot_file, 'rb', buffering=1 << 20) as f:
+        try:
+            import ijson
+        except ImportError:
+            yield from json_io.loads(f.read()).get('files', {}).items()
+            return
+        yield from ijson.kvitems(f, 'files')
+
+
+def list_snapshots(snapshots_dir=SNAPSHOTS_DIR):
+    """列出快照清单，返回 [(snapshot_id, 清单路径)]，新的在前
+
+    用 os.scandir 直接处理文件名字符串，不为每个目录项构造 Path。
+    """
+    prefix, suffix = "snapshot-", ".json"
+    with os.scandir(snapshots_dir) as it:
+        names = [
+            entry.name for entry in it
+            if entry.name.startswith(prefix) and entry.name.endswith(suffix)
+            and not entry.name.endswith(".meta.json")
+        ]
+    names.sort(reverse=True)
+    return [
+        (name[len(prefix):-len(suffix)], os.path.join(snapshots_dir, name))
+        for name in names
+    ]
+
+
+def read_snapshot_meta(snap_file):
+    """读取快照的 (timestamp, file_count)
+
+    优先读取 .meta.json 小文件；旧快照没有元数据时回退到完整解析
+    """
+    snap_file = os.fspath(snap_file)
+    meta_file = snap_file[:-len(".json")] + ".meta.json"
+    try:
+        meta = json_io.load(meta_file)
+    except FileNotFoundError:
+        pass
+    else:
+        return meta.get('timestamp', 'unknown'), meta.get('file_count', 0)
+
+    data = json_io.load(snap_file)
+    return data.get('timestamp', 'unknown'), len(data.get('files', {}))
+
+
+def restore_file(file_path, file_data, objects_dir=OBJECTS_DIR, stat_index=None):
+    """把单个快照条目写回 file_path
+
+    目标文件内容已与快照一致时不重写（与 git checkout 相同）。
+    stat_index 为 load_stat_index() 返回的字典，命中时连哈希都不用算。
+    返回 RESTORED / UNCHANGED / MISMATCH。
+    """
+    expected_hash = file_data.get('hash', '')
+    hash_algo = file_data.get('hash_algo', 'sha256')
+    if _is_unchanged(file_path, file_data, stat_index):
+        return UNCHANGED
+
+    if 'content' in file_data:
+        actual_digest = _write_content(file_path, file_data['content'], hash_algo)
+    else:
+        actual_digest = _copy_object(
+            file_path, expected_hash, hash_algo,
+            file_data.get('compression', 'none'), objects_dir
+        )
+
+    if stat_index is not None:
+        stat_index[file_path] = _index_entry(os.stat(file_path), hash_algo, actual_digest.hex())
+    return RESTORED if _digest_matches(actual_digest, expected_hash) else MISMATCH
+
+
+def copy_restored(src_path, file_path, file_data, src_status, stat_index=None):
+    """内容相同的条目直接从已恢复的 src_path 拷贝
+
+    正文和校验只需在第一份上做一次；shutil.copyfile 在 Linux 上走 sendfile，
+    数据不经过用户态。不用硬链接：工作区文件共享 inode 后修改一个会影响另一个。
+    src_status 为 src_path 的 restore_file 结果，返回值含义与 restore_file 相同。
+    """
+    if _is_unchanged(file_path, file_data, stat_index):
+        return UNCHANGED
+
+    shutil.copyfile(src_path, file_path)
+    if stat_index is not None and src_path in stat_index:
+        # 与 src_path 内容相同，直接沿用它的 hash_algo 和 hash
+        stat_index[file_path] = _index_entry(os.stat(file_path), *stat_index[src_path][3:5])
+    return MISMATCH if src_status == MISMATCH else RESTORED
+
+
+def load_stat_index(index_file=INDEX_FILE):
+    """读取 {path: [st_ino, st_mtime_ns, st_size, hash_algo, hash, recorded_ns]}；不存在或损坏时返回空字典"""
+    try:
+        return json_io.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def prune_stat_index(stat_index, paths):
+    """只保留 paths 中且文件仍存在的条目，索引不随历史路径无限增长"""
+    return {
+        path: entry for path, entry in stat_index.items()
+        if path in paths and os.path.exists(path)
+    }
+
+
+def save_stat_index(stat_index, index_file=INDEX_FILE):
+    """保存 stat 索引"""
+    Path(index_file).parent.mkdir(parents=True, exist_ok=True)
+    json_io.dump(stat_index, index_file)
+
+
+def _stat_key(st):
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def _index_entry(st, hash_algo, file_hash):
+    # recorded_ns 用于 racy 判断，见 _current_hash
+    return _stat_key(st) + [hash_algo, file_hash, time.time_ns()]
+
+
+def _is_unchanged(file_path, file_data, stat_index=None):
+    """目标文件内容是否已与快照条目一致"""
+    # 新版清单的 size 是字节数，大小不同的文件无需哈希；旧版是字符数，不能用
+    expected_size = None if 'content' in file_data else file_data.get('size')
+    hash_algo = file_data.get('hash_algo', 'sha256')
+    return _current_hash(file_path, hash_algo, expected_size, stat_index) == file_data.get('hash', '')
+
+
+def _current_hash(file_path, hash_algo="sha256", expected_size=None, stat_index=None):
+    """目标文件当前内容的哈希；文件不存在或大小不符时返回 None
+
+    stat 信息（inode、mtime、大小）与索引一致且算法相同时直接使用缓存的哈希；
+    记录时文件刚被修改过（与 git 的 racy 判断相同）的条目不可信，重新计算。
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    if expected_size is not None and st.st_size != expected_size:
+        return None
+
+    key = _stat_key(st)
+    if stat_index is not None:
+        cached = stat_index.get(file_path)
+        if (cached and len(cached) > 5 and cached[:4] == key + [hash_algo]
+                and cached[5] - st.st_mtime_ns >= RACY_WINDOW_NS):
+            return cached[4]
+
+    with open(file_path, 'rb') as f:
+        file_hash = _file_digest(f, hash_algo).hexdigest()
+    if stat_index is not None:
+        stat_index[file_path] = _index_entry(st, hash_algo, file_hash)
+    return file_hash
+
+
+def _file_digest(f, hash_algo="sha256"):
+    """hashlib.file_digest 仅 Python 3.11+ 提供，更早的版本用 readinto 分块读取"""
+    if hasattr(hashlib, 'file_digest'):
+        return hashlib.file_digest(f, lambda: new_hasher(hash_algo))
+    hasher = new_hasher(hash_algo)
+    buf = bytearray(_CHUNK_SIZE)
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        hasher.update(view[:n])
+    return hasher
+
+
+def _digest_matches(actual_digest, expected_hash):
+    """用原始摘要字节比较，省去 hexdigest 的字符串分配"""
+    try:
+        expected_digest = bytes.fromhex(expected_hash)
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual_digest, expected_digest)
+
+
+def _write_content(file_path, content, hash_algo="sha256"):
+    """旧版快照：正文内嵌在清单里，写入并返回摘要"""
+    # 只编码一次：写盘与哈希共用同一份字节
+    data = content.encode('utf-8')
+    fd = _open_for_write(file_path)
+    try:
+        _write_all(fd, data)
+    finally:
+        os.close(fd)
+    hasher = new_hasher(hash_algo)
+    hasher.update(data)
+    return hasher.digest()
+
+
+def _copy_object(file_path, file_hash, hash_algo, compression, objects_dir):
+    """从对象库解出正文写入 file_path，返回实际内容的摘要"""
+    zstandard = _zstd() if compression == "zstd" else None
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("zstandard package not installed. Run: pip install zstandard")
+
+    src = object_path(file_hash, compression, objects_dir)
+    digest = new_hasher(hash_algo)
+    with open(src, 'rb') as fin:
+        reader = zstandard.ZstdDecompressor().stream_reader(fin) if zstandard else fin
+        fd = _open_for_write(file_path)
+        try:
+            # 边拷贝边哈希，校验不需要再读一遍目标文件
+            while chunk := reader.read(_CHUNK_SIZE):
+                digest.update(chunk)
+                _write_all(fd, chunk)
+        finally:
+            os.close(fd)
+    return digest.digest()
+
+
+def _open_for_write(file_path):
+    """以二进制方式打开（截断）目标文件，返回原始 fd"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    return os.open(file_path, flags, 0o666)
+
+
+def _write_all(fd, data):
+    """整块写入 fd
+
+    恢复时每个文件只整体写一次，绕过 BufferedWriter 直接 os.write；
+    os.write 可能只写入一部分，循环直到写完。
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]